@@ -1,6 +1,14 @@
 import duckdb
+import pyarrow
 db = duckdb.connect(database=':memory:')
 db.execute("CREATE TABLE people (id INTEGER, name TEXT, age INTEGER)")
 db.execute("INSERT INTO people VALUES (1, 'Alice', 25), (2, 'Bob', 30), (3, 'Charlie', 35)")
-result = db.execute("SELECT * FROM people").fetchall()
-print(result)
\ No newline at end of file
+# executemany est pratique pour quelques lignes, mais exécute l'INSERT préparé une fois par ligne
+rows = [(4, 'Diane', 28), (5, 'Eric', 41)]
+db.executemany("INSERT INTO people VALUES (?, ?, ?)", rows)
+# Pour un chargement en masse, insérer toute une table Arrow en une seule requête
+nouvelles_personnes = pyarrow.table({'id': [6, 7], 'name': ['Fatou', 'Gaston'], 'age': [33, 52]})
+db.execute("INSERT INTO people SELECT * FROM nouvelles_personnes")
+# Récupérer le résultat au format Arrow (colonnes) plutôt qu'en tuples Python
+result = db.sql("SELECT * FROM people").to_arrow_table().to_pylist()
+print(result)
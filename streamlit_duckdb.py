@@ -1,10 +1,13 @@
 import streamlit as st
 import duckdb
-import pandas as pd
+import polars as pl
 import plotly.express as px
 import plotly.graph_objects as go
 import tempfile
+import hashlib
+import io
 import os
+import threading
 
 # Configuration de la page
 st.set_page_config(page_title="Analyse des données du Titanic avec DuckDB", layout="wide")
@@ -13,11 +16,217 @@ st.set_page_config(page_title="Analyse des données du Titanic avec DuckDB", lay
 st.title("Analyse des données du Titanic avec DuckDB et Streamlit")
 st.write("Cette application analyse les données des passagers du Titanic en utilisant DuckDB et Streamlit.")
 
+# Version de DuckDB (constante pour le processus, inutile de la redemander par SQL)
+DUCKDB_VERSION = duckdb.__version__
+
+# URL des données Titanic de démonstration
+URL_TITANIC_DEMO = "https://raw.githubusercontent.com/datasciencedojo/datasets/master/titanic.csv"
+
+# Chemin de la base DuckDB persistante (conservée entre les réexécutions de Streamlit)
+# Le fichier est verrouillé par le processus qui l'ouvre : chaque processus de l'application
+# doit utiliser son propre chemin, configurable avec la variable d'environnement TITANIC_DUCKDB_PATH
+CHEMIN_BASE_DUCKDB = os.environ.get('TITANIC_DUCKDB_PATH', os.path.join(tempfile.gettempdir(), 'titanic.duckdb'))
+
+# Verrou protégeant la connexion partagée (une connexion DuckDB n'est pas utilisable par plusieurs threads à la fois)
+VERROU_CONNEXION = threading.Lock()
+
+# Fonction pour calculer la limite mémoire de DuckDB : la moitié de la mémoire disponible,
+# en tenant compte de la limite du conteneur (cgroup v2) si elle existe
+def calculer_limite_memoire():
+    try:
+        memoire_disponible = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+    try:
+        with open('/sys/fs/cgroup/memory.max') as fichier_cgroup:
+            limite_cgroup = fichier_cgroup.read().strip()
+        if limite_cgroup != 'max':
+            memoire_disponible = min(memoire_disponible, int(limite_cgroup))
+    except (OSError, ValueError):
+        pass
+    return f"{memoire_disponible // 2 // (1024 * 1024)}MB"
+
+# Fonction pour obtenir la connexion DuckDB partagée (une seule connexion gérée par le cache de Streamlit)
+@st.cache_resource
+def get_conn():
+    conn = duckdb.connect(database=CHEMIN_BASE_DUCKDB, read_only=False)
+    # Limiter explicitement le parallélisme et la mémoire utilisés par DuckDB dans le processus Streamlit
+    conn.execute(f"PRAGMA threads={min(4, os.cpu_count() or 2)}")
+    limite_memoire = calculer_limite_memoire()
+    if limite_memoire is not None:
+        conn.execute(f"PRAGMA memory_limit='{limite_memoire}'")
+    return conn
+
+# Fonction pour obtenir la connexion DuckDB de la session Streamlit
+# (curseur propre à la session sur la base partagée, chaque session s'exécutant dans son propre thread)
+def get_session_conn():
+    if 'conn' not in st.session_state:
+        with VERROU_CONNEXION:
+            st.session_state['conn'] = get_conn().cursor()
+    return st.session_state['conn']
+
+# Fonction pour vérifier si la table de démonstration existe déjà dans la base
+def table_demo_existe(conn):
+    return conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'titanic'"
+    ).fetchone()[0] > 0
+
 # Fonction pour charger les données de démonstration du Titanic
-def charger_donnees_titanic_demo():
-    # URL des données Titanic de démonstration
-    url = "https://raw.githubusercontent.com/datasciencedojo/datasets/master/titanic.csv"
-    return pd.read_csv(url)
+# (lecture directe du CSV par DuckDB, la table n'est créée que si elle n'existe pas encore ; la création
+# se fait sous verrou, sinon deux sessions simultanées provoquent un conflit d'écriture dans le catalogue)
+def charger_donnees_titanic_demo(conn):
+    if table_demo_existe(conn):
+        return
+    with VERROU_CONNEXION:
+        if not table_demo_existe(conn):
+            conn.execute("CREATE TABLE titanic AS SELECT * FROM read_csv_auto(?)", [URL_TITANIC_DEMO])
+
+# Fonction pour enregistrer un fichier CSV importé dans DuckDB
+# Le CSV est lu par DuckDB (détection du séparateur et des types) et chargé dans une table Arrow
+# en mémoire, que DuckDB parcourt ensuite directement via une vue enregistrée. La vue,
+# nommée d'après l'empreinte du fichier, n'est visible que sur la connexion de la session et n'est
+# enregistrée qu'une fois par fichier ; la vue du fichier précédent est retirée pour libérer sa mémoire.
+def enregistrer_fichier_importe(conn, empreinte, contenu):
+    nom_table = f"titanic_import_{empreinte}"
+    ancienne_table = st.session_state.get('fichier_importe')
+    if ancienne_table != nom_table:
+        if ancienne_table is not None:
+            conn.unregister(ancienne_table)
+            st.session_state.pop('fichier_importe')
+        conn.register(nom_table, conn.read_csv(io.BytesIO(contenu)).to_arrow_table())
+        st.session_state['fichier_importe'] = nom_table
+    return nom_table
+
+# Libellés des groupes d'âge (l'identifiant 9 regroupe les âges inconnus)
+GROUPES_AGE = {
+    0: '0-9', 1: '10-19', 2: '20-29', 3: '30-39', 4: '40-49',
+    5: '50-59', 6: '60-69', 7: '70-79', 8: '80+', 9: 'Inconnu'
+}
+
+# Fonction pour calculer tous les agrégats en un seul parcours de la table avec DuckDB
+# (mise en cache par empreinte du jeu de données pour ne pas relancer la requête à chaque interaction)
+# Le groupe d'âge est calculé une seule fois par ligne dans la CTE, sous forme d'entier
+# (arithmétique plutôt qu'une cascade de CASE), et grouping_id identifie l'ensemble de
+# regroupement de chaque ligne (bit à 1 = colonne non regroupée, dans l'ordre Sex, bucket_id, Pclass).
+# Les statistiques par sexe et par âge sont dérivées du croisement (Sex, bucket_id) plutôt que recalculées.
+@st.cache_data
+def calculer_agregats(_conn, nom_table, empreinte):
+    agregats = _conn.execute(f"""
+        WITH t AS (
+            SELECT 
+                Sex,
+                Pclass,
+                Survived,
+                CASE WHEN Age IS NULL THEN 9 ELSE LEAST(CAST(FLOOR(Age / 10) AS INTEGER), 8) END as bucket_id
+            FROM {nom_table}
+        )
+        SELECT 
+            GROUPING(Sex, bucket_id, Pclass) as grouping_id,
+            Sex,
+            bucket_id,
+            Pclass as classe,
+            COUNT(*) FILTER (WHERE Survived = 1) as nombre_survivants,
+            COUNT(*) FILTER (WHERE Survived = 0) as nombre_deces,
+            COUNT(*) as total,
+            ROUND(SUM(Survived) * 100.0 / COUNT(*), 2) as taux_survie
+        FROM t
+        GROUP BY GROUPING SETS ((), (Sex, bucket_id), (Pclass))
+        ORDER BY grouping_id, Sex, bucket_id, classe
+    """).pl()
+    return agregats.with_columns(
+        pl.col('bucket_id').replace_strict(GROUPES_AGE, default=None).alias('groupe_age')
+    )
+
+# Expression Polars pour calculer le taux de survie (%) à partir d'effectifs agrégés
+def calculer_taux_survie():
+    return (pl.col('nombre_survivants') * 100.0 / pl.col('total')).round(2).alias('taux_survie')
+
+# Fonctions pour construire les graphiques Plotly
+# (mises en cache par empreinte du jeu de données pour ne pas reconstruire les figures à chaque interaction)
+@st.cache_resource
+def figure_survivants_sexe(empreinte, _survivants_par_sexe):
+    # Créer un graphique à barres groupées pour les survivants par sexe
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=_survivants_par_sexe['Sex'],
+        y=_survivants_par_sexe['nombre_survivants'],
+        name='Survivants',
+        marker_color='green'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=_survivants_par_sexe['Sex'],
+        y=_survivants_par_sexe['nombre_deces'],
+        name='Décès',
+        marker_color='red'
+    ))
+    
+    fig.update_layout(
+        barmode='group',
+        xaxis_title='Sexe',
+        yaxis_title='Nombre de passagers',
+        legend_title='Statut'
+    )
+    return fig
+
+@st.cache_resource
+def figure_survivants_age(empreinte, _survivants_par_age):
+    # Créer le graphique à barres groupées pour les survivants par âge
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=_survivants_par_age['groupe_age'],
+        y=_survivants_par_age['nombre_survivants'],
+        name='Survivants',
+        marker_color='green'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=_survivants_par_age['groupe_age'],
+        y=_survivants_par_age['nombre_deces'],
+        name='Décès',
+        marker_color='red'
+    ))
+    
+    fig.update_layout(
+        barmode='group',
+        xaxis_title='Groupe d\'âge',
+        yaxis_title='Nombre de passagers',
+        legend_title='Statut'
+    )
+    return fig
+
+@st.cache_resource
+def figure_taux_sexe_age(empreinte, _survivants_sexe_age):
+    # Créer le graphique de chaleur (heatmap)
+    fig = px.density_heatmap(
+        _survivants_sexe_age, 
+        x='groupe_age', 
+        y='Sex', 
+        z='taux_survie',
+        color_continuous_scale="RdYlGn",
+        title="Taux de survie (%) par sexe et groupe d'âge",
+        labels={'groupe_age': 'Groupe d\'âge', 'Sex': 'Sexe', 'taux_survie': 'Taux de survie (%)'},
+        text_auto=True
+    )
+    return fig
+
+@st.cache_resource
+def figure_classe(empreinte, _stats_classe):
+    # Créer le graphique par classe
+    fig = px.bar(
+        _stats_classe,
+        x='classe',
+        y='total_passagers',
+        color='pourcentage_survie',
+        text='pourcentage_survie',
+        labels={'classe': 'Classe', 'total_passagers': 'Nombre de passagers', 'pourcentage_survie': 'Taux de survie (%)'},
+        title="Taux de survie par classe",
+        color_continuous_scale="RdYlGn"
+    )
+    fig.update_traces(texttemplate='%{text}%', textposition='outside')
+    return fig
 
 # Sidebar pour le chargement des données
 st.sidebar.title("Source de données")
@@ -26,53 +235,77 @@ source_option = st.sidebar.radio(
     ["Données Titanic de démonstration", "Télécharger un fichier CSV"]
 )
 
-# Initialiser la connexion DuckDB
-conn = duckdb.connect(database=':memory:', read_only=False)
+# Initialiser la connexion DuckDB de la session
+conn = get_session_conn()
 
 # Obtenir les données
 if source_option == "Données Titanic de démonstration":
-    df = charger_donnees_titanic_demo()
+    try:
+        charger_donnees_titanic_demo(conn)
+    except duckdb.Error as erreur:
+        st.error(f"Impossible de charger les données de démonstration : {erreur}")
+        st.stop()
+    nom_table = 'titanic'
+    # La table de démonstration ne change pas une fois créée
+    empreinte = URL_TITANIC_DEMO
     st.sidebar.success("Données Titanic de démonstration chargées!")
     
-    # Enregistrer les données dans DuckDB
-    conn.execute("CREATE TABLE IF NOT EXISTS titanic AS SELECT * FROM df")
-    
 else:
     uploaded_file = st.sidebar.file_uploader("Télécharger un fichier CSV", type=["csv"])
     if uploaded_file is not None:
-        # Sauvegarder temporairement le fichier
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_path = tmp_file.name
-        
-        # Créer une table à partir du CSV avec DuckDB
-        conn.execute(f"CREATE TABLE IF NOT EXISTS titanic AS SELECT * FROM read_csv_auto('{tmp_path}')")
+        # Enregistrer le fichier dans DuckDB (une seule fois par fichier importé)
+        contenu = uploaded_file.getvalue()
+        empreinte = hashlib.md5(contenu).hexdigest()
+        try:
+            nom_table = enregistrer_fichier_importe(conn, empreinte, contenu)
+        except duckdb.Error as erreur:
+            st.error(f"Impossible de lire le fichier CSV : {erreur}")
+            st.stop()
         
-        # Charger les données pour affichage
-        df = conn.execute("SELECT * FROM titanic").fetchdf()
-        st.sidebar.success(f"{len(df)} passagers chargés!")
-        
-        # Supprimer le fichier temporaire
-        os.unlink(tmp_path)
+        # Compter les passagers chargés sans matérialiser toute la table
+        nombre_passagers = conn.execute(f"SELECT COUNT(*) FROM {nom_table}").fetchone()[0]
+        st.sidebar.success(f"{nombre_passagers} passagers chargés!")
     else:
         st.info("Veuillez télécharger un fichier CSV ou utiliser les données de démonstration.")
         st.stop()
 
 # Afficher un aperçu des données
 st.subheader("Aperçu des données")
-st.dataframe(df.head(10))
+st.dataframe(conn.execute(f"SELECT * FROM {nom_table} LIMIT 10").pl())
 
 # Statistiques générales
 st.header("Statistiques générales")
 
-# Utiliser DuckDB pour les statistiques de survie
-stats_generales = conn.execute("""
-    SELECT 
-        COUNT(*) as total_passagers,
-        SUM(Survived) as total_survivants,
-        ROUND(SUM(Survived) * 100.0 / COUNT(*), 2) as pourcentage_survie
-    FROM titanic
-""").fetchdf()
+# Utiliser DuckDB pour les statistiques de survie (résultat mis en cache tant que les données ne changent pas)
+agregats = calculer_agregats(conn, nom_table, empreinte)
+
+# Répartir les lignes entre les différentes analyses
+GROUPEMENT_SEXE_AGE = 1   # (Sex, bucket_id)
+GROUPEMENT_CLASSE = 6     # (Pclass)
+GROUPEMENT_GLOBAL = 7     # ()
+
+stats_generales = agregats.filter(pl.col('grouping_id') == GROUPEMENT_GLOBAL).rename({
+    'total': 'total_passagers',
+    'nombre_survivants': 'total_survivants',
+    'taux_survie': 'pourcentage_survie'
+})
+survivants_sexe_age = agregats.filter(pl.col('grouping_id') == GROUPEMENT_SEXE_AGE).select(
+    ['Sex', 'bucket_id', 'groupe_age', 'nombre_survivants', 'nombre_deces', 'total', 'taux_survie']
+)
+# Les statistiques par sexe et par groupe d'âge sont des sommes du croisement (Sex, bucket_id)
+survivants_par_sexe = survivants_sexe_age.group_by('Sex').agg(
+    pl.col(['nombre_survivants', 'nombre_deces', 'total']).sum()
+).sort('Sex').with_columns(calculer_taux_survie())
+survivants_par_age = survivants_sexe_age.group_by(['bucket_id', 'groupe_age']).agg(
+    pl.col(['nombre_survivants', 'nombre_deces', 'total']).sum()
+).sort('bucket_id').with_columns(calculer_taux_survie())
+stats_classe = agregats.filter(pl.col('grouping_id') == GROUPEMENT_CLASSE).select(
+    ['classe', 'total', 'nombre_survivants', 'taux_survie']
+).rename({
+    'total': 'total_passagers',
+    'nombre_survivants': 'total_survivants',
+    'taux_survie': 'pourcentage_survie'
+})
 
 col1, col2, col3 = st.columns(3)
 col1.metric("Nombre total de passagers", stats_generales['total_passagers'][0])
@@ -82,230 +315,69 @@ col3.metric("Taux de survie", f"{stats_generales['pourcentage_survie'][0]}%")
 # Créer les deux graphiques demandés
 st.header("Analyse des survivants")
 
-# 1. Graphique du nombre de survivants par sexe
-survivants_par_sexe = conn.execute("""
-    SELECT 
-        Sex,
-        SUM(CASE WHEN Survived = 1 THEN 1 ELSE 0 END) as nombre_survivants,
-        SUM(CASE WHEN Survived = 0 THEN 1 ELSE 0 END) as nombre_deces,
-        COUNT(*) as total
-    FROM titanic
-    GROUP BY Sex
-    ORDER BY Sex
-""").fetchdf()
-
-# 2. Graphique du nombre de survivants par âge
-# D'abord, créer des groupes d'âge pour une meilleure visualisation
-survivants_par_age = conn.execute("""
-    SELECT 
-        CASE 
-            WHEN Age < 10 THEN '0-9'
-            WHEN Age < 20 THEN '10-19'
-            WHEN Age < 30 THEN '20-29'
-            WHEN Age < 40 THEN '30-39'
-            WHEN Age < 50 THEN '40-49'
-            WHEN Age < 60 THEN '50-59'
-            WHEN Age < 70 THEN '60-69'
-            WHEN Age < 80 THEN '70-79'
-            WHEN Age IS NULL THEN 'Inconnu'
-            ELSE '80+'
-        END as groupe_age,
-        SUM(CASE WHEN Survived = 1 THEN 1 ELSE 0 END) as nombre_survivants,
-        SUM(CASE WHEN Survived = 0 THEN 1 ELSE 0 END) as nombre_deces,
-        COUNT(*) as total
-    FROM titanic
-    GROUP BY groupe_age
-    ORDER BY groupe_age
-""").fetchdf()
-
 # Afficher les deux graphiques côte à côte
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Survivants par sexe")
     
-    # Créer un graphique à barres groupées pour les survivants par sexe
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        x=survivants_par_sexe['Sex'],
-        y=survivants_par_sexe['nombre_survivants'],
-        name='Survivants',
-        marker_color='green'
-    ))
-    
-    fig.add_trace(go.Bar(
-        x=survivants_par_sexe['Sex'],
-        y=survivants_par_sexe['nombre_deces'],
-        name='Décès',
-        marker_color='red'
-    ))
-    
-    fig.update_layout(
-        barmode='group',
-        xaxis_title='Sexe',
-        yaxis_title='Nombre de passagers',
-        legend_title='Statut'
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    # Graphique à barres groupées pour les survivants par sexe
+    st.plotly_chart(figure_survivants_sexe(empreinte, survivants_par_sexe), use_container_width=True)
     
     # Ajouter des statistiques
-    taux_survie_sexe = conn.execute("""
-        SELECT 
-            Sex,
-            ROUND(SUM(Survived) * 100.0 / COUNT(*), 2) as taux_survie
-        FROM titanic
-        GROUP BY Sex
-    """).fetchdf()
+    taux_survie_sexe = survivants_par_sexe.select(['Sex', 'taux_survie'])
     
     st.write("Taux de survie par sexe:")
-    for index, row in taux_survie_sexe.iterrows():
-        st.write(f"- {row['Sex']}: {row['taux_survie']}%")
+    st.markdown("\n".join(
+        f"- {ligne['Sex']}: {ligne['taux_survie']}%" for ligne in taux_survie_sexe.iter_rows(named=True)
+    ))
 
 with col2:
     st.subheader("Survivants par groupe d'âge")
     
     # Filtrer les groupes d'âge non-nuls pour un graphique plus clair
-    survivants_par_age_filtre = survivants_par_age[survivants_par_age['groupe_age'] != 'Inconnu']
-    
-    # Créer le graphique à barres empilées pour les survivants par âge
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        x=survivants_par_age_filtre['groupe_age'],
-        y=survivants_par_age_filtre['nombre_survivants'],
-        name='Survivants',
-        marker_color='green'
-    ))
-    
-    fig.add_trace(go.Bar(
-        x=survivants_par_age_filtre['groupe_age'],
-        y=survivants_par_age_filtre['nombre_deces'],
-        name='Décès',
-        marker_color='red'
-    ))
-    
-    fig.update_layout(
-        barmode='group',
-        xaxis_title='Groupe d\'âge',
-        yaxis_title='Nombre de passagers',
-        legend_title='Statut',
-        xaxis={'categoryorder': 'array', 
-               'categoryarray': ['0-9', '10-19', '20-29', '30-39', '40-49', '50-59', '60-69', '70-79', '80+']}
-    )
+    # (le tri sur l'identifiant entier donne directement l'ordre des groupes sur l'axe)
+    survivants_par_age_filtre = survivants_par_age.filter(pl.col('groupe_age') != 'Inconnu').sort('bucket_id')
     
-    st.plotly_chart(fig, use_container_width=True)
+    # Graphique à barres pour les survivants par âge
+    st.plotly_chart(figure_survivants_age(empreinte, survivants_par_age_filtre), use_container_width=True)
     
     # Afficher le taux de survie par groupe d'âge
-    taux_survie_age = conn.execute("""
-        SELECT 
-            CASE 
-                WHEN Age < 10 THEN '0-9'
-                WHEN Age < 20 THEN '10-19'
-                WHEN Age < 30 THEN '20-29'
-                WHEN Age < 40 THEN '30-39'
-                WHEN Age < 50 THEN '40-49'
-                WHEN Age < 60 THEN '50-59'
-                WHEN Age < 70 THEN '60-69'
-                WHEN Age < 80 THEN '70-79'
-                WHEN Age IS NULL THEN 'Inconnu'
-                ELSE '80+'
-            END as groupe_age,
-            ROUND(SUM(Survived) * 100.0 / COUNT(*), 2) as taux_survie
-        FROM titanic
-        WHERE Age IS NOT NULL
-        GROUP BY groupe_age
-        ORDER BY groupe_age
-    """).fetchdf()
+    taux_survie_age = survivants_par_age_filtre.select(['groupe_age', 'taux_survie'])
     
     st.write("Taux de survie par groupe d'âge:")
-    for index, row in taux_survie_age.iterrows():
-        st.write(f"- {row['groupe_age']}: {row['taux_survie']}%")
+    st.markdown("\n".join(
+        f"- {ligne['groupe_age']}: {ligne['taux_survie']}%" for ligne in taux_survie_age.iter_rows(named=True)
+    ))
 
 # Analyse croisée (sexe et âge combinés)
 st.header("Analyse croisée des survivants par sexe et âge")
 
-# Créer une requête pour obtenir les données croisées
-survivants_sexe_age = conn.execute("""
-    SELECT 
-        Sex,
-        CASE 
-            WHEN Age < 10 THEN '0-9'
-            WHEN Age < 20 THEN '10-19'
-            WHEN Age < 30 THEN '20-29'
-            WHEN Age < 40 THEN '30-39'
-            WHEN Age < 50 THEN '40-49'
-            WHEN Age < 60 THEN '50-59'
-            WHEN Age < 70 THEN '60-69'
-            WHEN Age < 80 THEN '70-79'
-            WHEN Age IS NULL THEN 'Inconnu'
-            ELSE '80+'
-        END as groupe_age,
-        ROUND(SUM(Survived) * 100.0 / COUNT(*), 2) as taux_survie,
-        COUNT(*) as total
-    FROM titanic
-    GROUP BY Sex, groupe_age
-    ORDER BY Sex, groupe_age
-""").fetchdf()
-
 # Filtrer les données pour exclure les âges inconnus
-survivants_sexe_age_filtre = survivants_sexe_age[survivants_sexe_age['groupe_age'] != 'Inconnu']
-
-# Créer le graphique de chaleur (heatmap)
-fig = px.density_heatmap(
-    survivants_sexe_age_filtre, 
-    x='groupe_age', 
-    y='Sex', 
-    z='taux_survie',
-    color_continuous_scale="RdYlGn",
-    title="Taux de survie (%) par sexe et groupe d'âge",
-    labels={'groupe_age': 'Groupe d\'âge', 'Sex': 'Sexe', 'taux_survie': 'Taux de survie (%)'},
-    text_auto=True
-)
-
-fig.update_layout(
-    xaxis={'categoryorder': 'array', 
-           'categoryarray': ['0-9', '10-19', '20-29', '30-39', '40-49', '50-59', '60-69', '70-79', '80+']}
-)
+survivants_sexe_age_filtre = survivants_sexe_age.filter(pl.col('groupe_age') != 'Inconnu').sort('bucket_id', maintain_order=True)
 
-st.plotly_chart(fig, use_container_width=True)
+# Graphique de chaleur (heatmap)
+st.plotly_chart(figure_taux_sexe_age(empreinte, survivants_sexe_age_filtre), use_container_width=True)
 
 # Analyse par classe
 st.header("Analyse par classe de voyage")
 
-# Requête pour obtenir les statistiques par classe
-stats_classe = conn.execute("""
-    SELECT 
-        Pclass as classe,
-        COUNT(*) as total_passagers,
-        SUM(Survived) as total_survivants,
-        ROUND(SUM(Survived) * 100.0 / COUNT(*), 2) as pourcentage_survie
-    FROM titanic
-    GROUP BY classe
-    ORDER BY classe
-""").fetchdf()
-
-# Créer le graphique
-fig = px.bar(
-    stats_classe,
-    x='classe',
-    y='total_passagers',
-    color='pourcentage_survie',
-    text='pourcentage_survie',
-    labels={'classe': 'Classe', 'total_passagers': 'Nombre de passagers', 'pourcentage_survie': 'Taux de survie (%)'},
-    title="Taux de survie par classe",
-    color_continuous_scale="RdYlGn"
-)
-fig.update_traces(texttemplate='%{text}%', textposition='outside')
-
-st.plotly_chart(fig, use_container_width=True)
-
+# Graphique des passagers et du taux de survie par classe
+st.plotly_chart(figure_classe(empreinte, stats_classe), use_container_width=True)
 
 # Exporter les données
 st.header("Exporter les données")
 if st.button("Exporter les résultats en CSV"):
-    csv = conn.execute("SELECT * FROM titanic").fetchdf().to_csv(index=False)
+    # Écrire le CSV directement avec DuckDB dans un fichier temporaire propre à cet export,
+    # puis le supprimer une fois son contenu lu
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as fichier_export:
+        chemin_export = fichier_export.name
+    try:
+        conn.execute(f"COPY (SELECT * FROM {nom_table}) TO '{chemin_export}' (HEADER, DELIMITER ',')")
+        with open(chemin_export, 'rb') as fichier_export:
+            csv = fichier_export.read()
+    finally:
+        os.unlink(chemin_export)
     st.download_button(
         label="Télécharger les données (CSV)",
         data=csv,
@@ -315,9 +387,5 @@ if st.button("Exporter les résultats en CSV"):
 
 # Afficher les informations sur DuckDB
 st.sidebar.subheader("À propos de DuckDB")
-version_duckdb = conn.execute("SELECT version()").fetchone()[0]
-st.sidebar.info(f"Version DuckDB: {version_duckdb}")
+st.sidebar.info(f"Version DuckDB: {DUCKDB_VERSION}")
 st.sidebar.write("DuckDB est un SGBD analytique embarqué optimisé pour l'analyse OLAP.")
-
-# Fermer la connexion DuckDB
-conn.close()
\ No newline at end of file